@@ -1,11 +1,13 @@
 # ai_parser.py
-from groq import Groq
+from groq import AsyncGroq, DefaultAioHttpClient, APIStatusError, APIConnectionError, BadRequestError, RateLimitError
 from dotenv import load_dotenv
 import os
-import json
+import orjson
 import time
+import asyncio
+import itertools
 import logging
-from typing import List, Tuple, Optional, Any, cast
+from typing import Dict, List, Set, Tuple, Optional, Any, cast
 
 load_dotenv()
 logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
@@ -13,45 +15,113 @@ logger = logging.getLogger("ai_parser")
 
 # -------------------------------
 # Load Groq Clients
+# Created once per process from the app lifespan (inside the running event
+# loop) so every request shares the same keep-alive connection pools.
 # -------------------------------
 _client_env_names = [f"gr_api_key{i}" for i in range(1, 7)]
-_clients = []
-configured = []
+_clients: List[AsyncGroq] = []
 
-for i, env_name in enumerate(_client_env_names, 1):
-    key = os.getenv(env_name)
-    if not key:
-        continue
-    try:
-        client = Groq(api_key=key)
-        _clients.append(client)
-        configured.append(f"{env_name} (index {i})")
-    except Exception as e:
-        logger.exception("Failed to initialize Groq client %s: %s", env_name, e)
 
-if configured:
-    logger.info("Configured Groq clients: %s", ", ".join(configured))
+def init_clients() -> List[AsyncGroq]:
+    if _clients:
+        return _clients
+
+    configured = []
+    for i, env_name in enumerate(_client_env_names, 1):
+        key = os.getenv(env_name)
+        if not key:
+            continue
+        try:
+            # max_retries=0: _call_groq owns retry/backoff so a 429 can move to another key at once
+            client = AsyncGroq(api_key=key, http_client=DefaultAioHttpClient(), max_retries=0)
+            _clients.append(client)
+            configured.append(f"{env_name} (index {i})")
+        except Exception as e:
+            logger.exception("Failed to initialize Groq client %s: %s", env_name, e)
+
+    if configured:
+        logger.info("Configured Groq clients: %s", ", ".join(configured))
+    return _clients
+
+
+async def close_clients() -> None:
+    for client in _clients:
+        try:
+            await client.close()
+        except Exception:
+            logger.exception("Failed to close Groq client")
+    _clients.clear()
+    _client_cooldown.clear()
 
 
-def get_available_clients() -> List[Groq]:
+def get_available_clients() -> List[AsyncGroq]:
     return _clients
 
 
 # -------------------------------
-# Prompt Template
-# Note: any literal braces must be doubled so str.format works.
+# Client Selection
+# Round-robin across keys so load is spread over every configured account;
+# a key that was rate limited is skipped until its cooldown expires.
 # -------------------------------
-MODEL_PROMPT_TEMPLATE = (
+_client_counter = itertools.count()
+_client_cooldown: Dict[int, float] = {}
+
+
+def _pick_client(n: int, skip: Set[int]) -> Tuple[Optional[int], float]:
+    """Return (index, 0.0) for the next usable client, or (None, wait) if all are cooling down."""
+    now = time.monotonic()
+    for _ in range(n):
+        idx = next(_client_counter) % n
+        if idx in skip:
+            continue
+        if _client_cooldown.get(idx, 0.0) <= now:
+            return idx, 0.0
+    waits = [_client_cooldown.get(i, 0.0) - now for i in range(n) if i not in skip]
+    return None, max(min(waits), 0.0) if waits else 0.0
+
+
+# -------------------------------
+# Model / Prompt Version
+# Bump PROMPT_VERSION whenever the prompt changes so cached results are invalidated.
+# -------------------------------
+MODEL = "llama-3.3-70b-versatile"
+PROMPT_VERSION = "3"
+
+
+# -------------------------------
+# Prompt
+# The system prompt is constant across requests so the provider can reuse its
+# cached prefix; the document itself always goes in the user message.
+# -------------------------------
+SYSTEM_PROMPT = (
     "You are an expert resume parser. Return ONLY valid JSON (top-level object).\n\n"
     "1) Extract a flat 'skills' array of all detected skills, tools, libraries, frameworks, cloud services,\n"
     "   methodologies and soft skills.\n"
     "2) Return 'is_resume' (boolean) and 'confidence' (float between 0.0 and 1.0).\n"
-    "3) If you cannot fully parse sections, always include at least {{'skills': [...], 'is_resume': true/false, 'confidence': 0.0}}.\n"
-    "4) Output must be pure JSON with no additional commentary.\n\n"
-    "DOCUMENT_TEXT:\n{resume_text}\n"
+    "3) If you cannot fully parse sections, always include at least {'skills': [...], 'is_resume': true/false, 'confidence': 0.0}.\n"
+    "4) Output must be pure JSON with no additional commentary.\n"
 )
 
 
+# ~3k tokens; skill signal is concentrated at the top of a resume and input
+# tokens drive both cost and latency.
+MAX_CHARS = 12000
+
+
+def _truncate(resume_text: str, limit: int) -> str:
+    if len(resume_text) <= limit:
+        return resume_text
+    cut = resume_text.rfind("\n", 0, limit)
+    return resume_text[:cut if cut > 0 else limit]
+
+
+DOCUMENT_PREFIX = "DOCUMENT_TEXT:\n"
+
+
+def _document_message(resume_text: str) -> str:
+    return DOCUMENT_PREFIX + resume_text + "\n"
+
+
 # -------------------------------
 # JSON Safety Loader
 # -------------------------------
@@ -59,80 +129,160 @@ def _safe_load_json_from_model(raw: Optional[str]):
     if not raw:
         return None, "empty model response", ""
 
+    # JSON mode (response_format) guarantees a bare object, so no prose-stripping is needed
     s = raw.strip()
-
-    # First try direct JSON
     try:
-        return json.loads(s), None, s
-    except Exception:
-        pass
-
-    # Try extracting {...}
-    start, end = s.find("{"), s.rfind("}")
-    if start != -1 and end != -1 and end > start:
-        block = s[start:end+1]
-        try:
-            return json.loads(block), None, block
-        except Exception as e:
-            return None, f"json load failed: {e}", block[:2000]
-
-    return None, "no JSON object found", s[:2000]
+        return orjson.loads(s), None, s
+    except Exception as e:
+        return None, f"json load failed: {e}", s[:2000]
 
 
 # -------------------------------
-# Call Groq (Sync)
+# Call Groq (Async)
 # -------------------------------
-def _call_groq_sync(prompt_text: str, user_message: str = "", max_attempts: int = 2):
-    messages = [
-        {"role": "system", "content": prompt_text},
-        {"role": "user", "content": user_message or "Please parse the document."}
+def _build_messages(resume_text: str) -> List[dict]:
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": _document_message(resume_text)}
     ]
 
+
+MAX_RETRY_AFTER = 60.0
+
+
+def _retry_after_seconds(e: APIStatusError) -> Optional[float]:
+    """Read the server's Retry-After hint (seconds) from a 429 response, if present."""
+    try:
+        value = e.response.headers.get("retry-after")
+        return min(float(value), MAX_RETRY_AFTER) if value is not None else None
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+def _backoff_seconds(e: Exception, attempt: int) -> Optional[float]:
+    """Wait before retrying after `e`; None means the error is not retryable."""
+    if isinstance(e, RateLimitError):
+        retry_after = _retry_after_seconds(e)
+        return retry_after if retry_after is not None else float(2 ** attempt)
+    if isinstance(e, APIConnectionError):
+        return 0.5 * attempt
+    if isinstance(e, APIStatusError) and e.status_code >= 500:
+        return float(2 ** attempt)
+    return None
+
+
+def _failed_generation(e: BadRequestError) -> Optional[str]:
+    """Return the rejected output if JSON mode reported json_validate_failed, else None."""
+    body = e.body
+    if isinstance(body, dict):
+        body = body.get("error", body)
+    if isinstance(body, dict) and body.get("code") == "json_validate_failed":
+        return str(body.get("failed_generation") or "")
+    return None
+
+
+async def _call_groq(messages: List[dict], max_attempts: int = 2):
+    """Returns (raw, client_used, generation_error); generation_error is set when JSON mode rejected the output."""
     clients = get_available_clients()
     if not clients:
-        return None, None
-
-    for idx, client in enumerate(clients, 1):
-        for attempt in range(1, max_attempts + 1):
-            try:
-                logger.info("Calling Groq client %d (attempt %d)", idx, attempt)
-                resp = client.chat.completions.create(
-                    model="llama-3.3-70b-versatile",
-                    messages=cast(Any, messages),
-                    temperature=0.0,
-                    max_tokens=4096,
-                )
-                return resp.choices[0].message.content, f"client{idx}"
-            except Exception:
-                time.sleep(0.5 * attempt)
+        return None, None, None
+
+    # Only API/transport errors move on to the next key; bad JSON (including
+    # JSON mode's json_validate_failed) goes back to parse_document's feedback loop.
+    n = len(clients)
+    failures: Dict[int, int] = {}
+    exhausted: Set[int] = set()
+    total_wait = 0.0
+    while len(exhausted) < n:
+        idx, wait = _pick_client(n, exhausted)
+        if idx is None:
+            total_wait += wait
+            logger.warning("All Groq clients cooling down; waiting %.1fs (total waited %.1fs)", wait, total_wait)
+            await asyncio.sleep(wait)
+            continue
+
+        attempt = failures.get(idx, 0) + 1
+        try:
+            logger.info("Calling Groq client %d (attempt %d)", idx + 1, attempt)
+            resp = await clients[idx].chat.completions.create(
+                model=MODEL,
+                messages=cast(Any, messages),
+                temperature=0.0,
+                max_tokens=4096,
+                response_format={"type": "json_object"},
+            )
+            return resp.choices[0].message.content, f"client{idx + 1}", None
+        except BadRequestError as e:
+            failed = _failed_generation(e)
+            if failed is not None:
+                logger.warning("Groq client %d: generation failed JSON validation", idx + 1)
+                return failed, f"client{idx + 1}", "json_validate_failed: output was not valid JSON"
+            logger.warning("Groq client %d failed: %s", idx + 1, e)
+            exhausted.add(idx)
+        except (APIStatusError, APIConnectionError) as e:
+            failures[idx] = attempt
+            delay = _backoff_seconds(e, attempt)
+            if delay is None or attempt >= max_attempts:
+                # Non-retryable (bad key, bad request) or out of attempts for this key
+                logger.warning("Groq client %d failed (attempt %d): %s", idx + 1, attempt, e)
+                exhausted.add(idx)
+                if delay is not None:
+                    _client_cooldown[idx] = time.monotonic() + delay
+                continue
+            # Cool this key down and let the next one take the request meanwhile
+            _client_cooldown[idx] = time.monotonic() + delay
+            logger.warning(
+                "Groq client %d failed (attempt %d): %s; cooling down %.1fs",
+                idx + 1, attempt, e, delay,
+            )
 
     logger.error("All Groq clients failed.")
-    return None, None
+    return None, None, None
 
 
 # -------------------------------
-# Parse Document Sync
+# Parse Document
 # -------------------------------
-def parse_document_sync(resume_text: str):
-    prompt = MODEL_PROMPT_TEMPLATE.format(resume_text=resume_text)
+MAX_JSON_FEEDBACK_ATTEMPTS = 2
 
-    try:
-        raw, used = _call_groq_sync(prompt)
-    except Exception as e:
-        return {"parsed": None, "raw": None, "client_used": None, "snippet": "", "error": str(e)}
 
-    if raw is None:
-        return {"parsed": None, "raw": None, "client_used": used, "snippet": "", "error": "No model response."}
+async def parse_document(resume_text: str):
+    messages = _build_messages(_truncate(resume_text, MAX_CHARS))
+
+    raw, used, parsed, err, snippet = None, None, None, None, ""
+    for attempt in range(MAX_JSON_FEEDBACK_ATTEMPTS):
+        if attempt:
+            # Feed the parse error back instead of re-sending the identical prompt
+            feedback = [{"role": "user", "content": f"Your output had error: {err}. Return only valid JSON."}]
+            if raw:
+                feedback.insert(0, {"role": "assistant", "content": raw})
+            messages = messages + feedback
+            await asyncio.sleep(1.0 * attempt)
+
+        try:
+            raw, used, generation_error = await _call_groq(messages)
+        except Exception as e:
+            return {"parsed": None, "raw": None, "client_used": None, "snippet": "", "error": str(e)}
+
+        if raw is None:
+            return {"parsed": None, "raw": None, "client_used": used, "snippet": "", "error": "No model response."}
+
+        if generation_error:
+            parsed, err, snippet = None, generation_error, raw[:2000]
+        else:
+            parsed, err, snippet = _safe_load_json_from_model(raw)
+        if err is None:
+            break
+        logger.warning("Model returned invalid JSON (attempt %d): %s", attempt + 1, err)
 
-    parsed, err, snippet = _safe_load_json_from_model(raw)
     return {"parsed": parsed, "raw": raw, "client_used": used, "snippet": snippet, "error": err}
 
 
 # -------------------------------
 # Extract Resume Info
 # -------------------------------
-def extract_resume_info(resume_text: str):
-    out = parse_document_sync(resume_text)
+async def extract_resume_info_async(resume_text: str):
+    out = await parse_document(resume_text)
     parsed = out.get("parsed")
     error = out.get("error")
 
@@ -143,17 +293,20 @@ def extract_resume_info(resume_text: str):
         # ----- Skills -----
         s = parsed.get("skills")
         if isinstance(s, list):
-            skills = [str(x).strip().lower() for x in s if str(x).strip()]
+            # dict.fromkeys dedupes in O(N) while keeping first-seen order
+            skills = list(dict.fromkeys(k for k in (str(x).strip().lower() for x in s) if k))
 
         # Fallback: technical_skills
         if not skills:
             ts = parsed.get("technical_skills")
             if isinstance(ts, dict):
+                seen = set()
                 for v in ts.values():
                     if isinstance(v, list):
                         for it in v:
                             it = str(it).strip().lower()
-                            if it and it not in skills:
+                            if it and it not in seen:
+                                seen.add(it)
                                 skills.append(it)
 
         # ----- Metadata -----
@@ -1,17 +1,115 @@
-from fastapi import FastAPI, File, UploadFile, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, File, UploadFile, HTTPException, Request
+from fastapi.responses import Response
 from fastapi.middleware.cors import CORSMiddleware
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import asynccontextmanager
 import io
-import asyncio
-from concurrent.futures import ThreadPoolExecutor
 import os
+import asyncio
+import multiprocessing
+import hashlib
+import zipfile
 import logging
+import orjson
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
 import ai_parser
+import cache
+import semantic_cache
+import pdf_text
+from pdf_text import PdfReader
+
+try:
+    from lxml import etree
+except ImportError:
+    etree = None
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
 logger = logging.getLogger("resume-extractor")
 
-app = FastAPI(title="AI-driven Resume Skill Extractor")
+# Surface missing parser dependencies at startup rather than on the first upload
+if PdfReader is None:
+    logger.error("pypdf is not installed; .pdf uploads will fail")
+if etree is None:
+    logger.error("lxml is not installed; .docx uploads will fail")
+
+# Page decoding is CPU-bound pure Python (holds the GIL), so long PDFs are split
+# across processes; below this page count the pool overhead isn't worth it.
+PARALLEL_PDF_MIN_PAGES = 8
+PDF_WORKERS = os.cpu_count() or 1
+_pdf_pool = None
+
+
+class ORJSONResponse(Response):
+    """JSON response serialized with orjson (FastAPI's own ORJSONResponse is deprecated)."""
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content)
+
+
+def _start_pdf_pool() -> ProcessPoolExecutor:
+    # forkserver: the app process is multi-threaded (aiohttp, to_thread, SQLite)
+    # by the time workers start, and forking it can deadlock.
+    ctx = multiprocessing.get_context("forkserver")
+    ctx.set_forkserver_preload(["pdf_text"])
+    return ProcessPoolExecutor(max_workers=PDF_WORKERS, mp_context=ctx)
+
+
+def _replace_broken_pdf_pool(broken: ProcessPoolExecutor) -> None:
+    """Swap in a fresh pool after a worker died (e.g. OOM-killed on a hostile PDF)."""
+    global _pdf_pool
+    # Concurrent requests may all see the same broken pool; only the first replaces it
+    if _pdf_pool is not broken:
+        return
+    logger.warning("PDF process pool broke; starting a new one")
+    broken.shutdown(wait=False, cancel_futures=True)
+    _pdf_pool = _start_pdf_pool()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global _pdf_pool
+    ai_parser.init_clients()
+    # With a single CPU the pool only adds pickling and IPC overhead
+    _pdf_pool = _start_pdf_pool() if PDF_WORKERS > 1 else None
+    # Model download/load happens here, not on the first upload
+    await asyncio.to_thread(semantic_cache.load)
+    try:
+        yield
+    finally:
+        await ai_parser.close_clients()
+        if _pdf_pool is not None:
+            _pdf_pool.shutdown(wait=False, cancel_futures=True)
+        _pdf_pool = None
+
+
+app = FastAPI(
+    title="AI-driven Resume Skill Extractor",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan,
+)
+
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(10 * 1024 * 1024)))
+# Room for multipart boundaries and part headers around the file itself
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+
+@app.middleware("http")
+async def limit_upload_size(request: Request, call_next):
+    # Runs before the form is parsed: the multipart body would otherwise be
+    # received and spooled to disk in full before the handler could reject it.
+    # Registered before CORS so the 413 still carries CORS headers.
+    content_length = request.headers.get("content-length")
+    if content_length is not None:
+        try:
+            too_large = int(content_length) > MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES
+        except ValueError:
+            return ORJSONResponse(status_code=400, content={"detail": "Invalid Content-Length"})
+        if too_large:
+            return ORJSONResponse(status_code=413, content={"detail": "File too large"})
+    return await call_next(request)
+
 
 app.add_middleware(
     CORSMiddleware,
@@ -20,61 +118,123 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Thread pool for blocking work (model SDK)
-executor = ThreadPoolExecutor(max_workers=2)
 
+async def _decode_pdf_in_pool(pool: ProcessPoolExecutor, file_bytes: bytes, n: int, max_chars: int) -> str:
+    # One contiguous page range per worker, so the upload is pickled and the PDF
+    # re-parsed once per worker rather than once per page. Each range stops at
+    # max_chars on its own; ranges are then joined in order up to the limit.
+    workers = min(PDF_WORKERS, n)
+    step = -(-n // workers)
+    loop = asyncio.get_running_loop()
+    ranges = await asyncio.gather(*(
+        loop.run_in_executor(pool, pdf_text.extract_pages, file_bytes, start, min(start + step, n), max_chars)
+        for start in range(0, n, step)
+    ))
+    parts = []
+    total = 0
+    for text in ranges:
+        if not text:
+            continue
+        parts.append(text)
+        total += len(text)
+        if total >= max_chars:
+            break
+    return "\n".join(parts)
 
-def extract_text_from_pdf(file_bytes: bytes) -> str:
-    try:
-        from PyPDF2 import PdfReader
-    except Exception as e:
-        raise RuntimeError(f"PdfReader import failed: {e}")
+
+def _read_pdf(file_bytes: bytes, max_chars: int) -> Tuple[Optional[str], int]:
+    """Open the PDF and decode it in-process if short; returns (text or None, page count)."""
+    reader = PdfReader(io.BytesIO(file_bytes))
+    n = len(reader.pages)
+    if n <= PARALLEL_PDF_MIN_PAGES or _pdf_pool is None:
+        return "\n".join(pdf_text.iter_page_text(reader.pages, max_chars)), n
+    return None, n
+
+
+async def extract_text_from_pdf(file_bytes: bytes) -> str:
+    if PdfReader is None:
+        raise RuntimeError("PdfReader import failed: pypdf is not installed")
+    # Only this much text ever reaches the model, so stop decoding pages there
+    max_chars = ai_parser.MAX_CHARS
     try:
-        reader = PdfReader(io.BytesIO(file_bytes))
-        pages = []
-        for page in reader.pages:
-            try:
-                pages.append(page.extract_text() or "")
-            except Exception:
-                pages.append("")
-        return "\n".join(pages)
+        # Opening and decoding are CPU-bound; keep them off the event loop
+        text, n = await asyncio.to_thread(_read_pdf, file_bytes, max_chars)
+        if text is not None:
+            return text
+
+        pool = _pdf_pool
+        try:
+            return await _decode_pdf_in_pool(pool, file_bytes, n, max_chars)
+        except BrokenProcessPool:
+            # This document may be what killed the worker; decode it in-process
+            # rather than feeding it to the new pool.
+            _replace_broken_pdf_pool(pool)
+            return await asyncio.to_thread(pdf_text.extract_pages, file_bytes, 0, n, max_chars)
     except Exception as e:
         raise RuntimeError(f"PDF parsing failed: {e}")
 
 
+_DOCX_NS = {
+    "w": "http://schemas.openxmlformats.org/wordprocessingml/2006/main",
+    "mc": "http://schemas.openxmlformats.org/markup-compatibility/2006",
+}
+_W = "{%s}" % _DOCX_NS["w"]
+# Uploaded XML is untrusted: no entity expansion, no network fetches
+_DOCX_XML_PARSER = etree.XMLParser(resolve_entities=False, no_network=True) if etree is not None else None
+# A small zip can inflate enormously; refuse document.xml beyond this
+MAX_DOCX_XML_BYTES = 20 * 1024 * 1024
+_RUN_BREAKS = {f"{_W}tab": "\t", f"{_W}br": "\n", f"{_W}cr": "\n"}
+
+# XPaths are compiled once; the run query is evaluated for every paragraph.
+if etree is not None:
+    # Paragraphs inside mc:Fallback duplicate the mc:Choice copy (e.g. text boxes)
+    _DOCX_PARAGRAPHS = etree.XPath("//w:p[not(ancestor::mc:Fallback)]", namespaces=_DOCX_NS)
+    # Only the paragraph's own runs: nested text-box paragraphs are visited on their own
+    _DOCX_RUN_CONTENT = etree.XPath(
+        "./w:r/* | ./w:hyperlink/w:r/* | ./w:ins/w:r/* | ./w:smartTag/w:r/*"
+        " | ./w:fldSimple/w:r/* | ./w:sdt/w:sdtContent/w:r/*",
+        namespaces=_DOCX_NS,
+    )
+
+
+def _docx_paragraph_text(p) -> str:
+    out = []
+    for el in _DOCX_RUN_CONTENT(p):
+        if el.tag == f"{_W}t":
+            out.append(el.text or "")
+        else:
+            out.append(_RUN_BREAKS.get(el.tag, ""))
+    return "".join(out)
+
+
 def extract_text_from_docx(file_bytes: bytes) -> str:
+    if etree is None:
+        raise RuntimeError("lxml import failed: lxml is not installed")
     try:
-        import docx
-    except Exception as e:
-        raise RuntimeError(f"docx import failed: {e}")
-    try:
-        doc = docx.Document(io.BytesIO(file_bytes))
+        with zipfile.ZipFile(io.BytesIO(file_bytes)) as z:
+            size = z.getinfo("word/document.xml").file_size
+            if size > MAX_DOCX_XML_BYTES:
+                raise ValueError(f"word/document.xml is {size} bytes uncompressed (limit {MAX_DOCX_XML_BYTES})")
+            xml = z.read("word/document.xml")
+        root = etree.fromstring(xml, _DOCX_XML_PARSER)
+        # One sweep over the raw XML instead of python-docx wrapper objects.
+        # Table cells and text boxes are paragraphs too, so they come out in document order.
         parts = []
-        for p in doc.paragraphs:
-            parts.append(p.text)
-        for table in doc.tables:
-            for row in table.rows:
-                for cell in row.cells:
-                    parts.append(cell.text)
+        for p in _DOCX_PARAGRAPHS(root):
+            text = _docx_paragraph_text(p)
+            if text.strip():
+                parts.append(text)
         return "\n".join(parts)
     except Exception as e:
         raise RuntimeError(f"DOCX parsing failed: {e}")
 
-@app.post("/upload")
-async def upload_resume(file: UploadFile = File(...)):
-    """Accepts .pdf or .docx resume files and returns extracted skills + parse info."""
-    filename = file.filename or "unknown"
-    ext = filename.split('.')[-1].lower()
-    try:
-        contents = await file.read()
-    except Exception as e:
-        logger.exception("Failed to read uploaded file")
-        raise HTTPException(status_code=400, detail=f"Failed to read uploaded file: {e}")
 
+async def _parse_contents(contents: bytes, ext: str, cache_key: str) -> Tuple[int, dict]:
+    """Extract text and run the AI parser; returns (status_code, response fields)."""
     # Extract text depending on extension
     try:
         if ext == 'pdf':
-            text = extract_text_from_pdf(contents)
+            text = await extract_text_from_pdf(contents)
         elif ext == 'docx':
             text = extract_text_from_docx(contents)
         else:
@@ -85,30 +245,35 @@ async def upload_resume(file: UploadFile = File(...)):
         logger.exception("Document parsing error")
         raise HTTPException(status_code=500, detail=str(e))
 
-    # Run the (potentially blocking) AI parser in the threadpool
-    loop = asyncio.get_event_loop()
+    # Near-duplicate of a resume we've already parsed
+    # Embed only what the model would see; DOCX text in particular is uncapped
+    similar, embedding = await semantic_cache.lookup(ai_parser._truncate(text, ai_parser.MAX_CHARS))
+    if similar is not None:
+        await cache.put(cache_key, similar)
+        return 200, {
+            "skills": similar["skills"],
+            "is_resume": bool(similar.get("is_resume", False))
+        }
+
+    # AI parser is async (AsyncGroq), so await it directly on the event loop
     try:
-        parsed = await loop.run_in_executor(executor, ai_parser.extract_resume_info, text)
+        parsed = await ai_parser.extract_resume_info_async(text)
     except Exception as e:
-        logger.exception("AI parsing executor raised an exception")
-        return JSONResponse(status_code=500, content={
-            "filename": filename,
-            "extension": ext,
+        logger.exception("AI parsing raised an exception")
+        return 500, {
             "skills": [],
             "error": f"AI parsing execution failed: {e}",
             "ai_raw": None
-        })
+        }
 
     # Normalize results
     if not parsed or not isinstance(parsed, dict):
         logger.error("AI parser returned no usable result or invalid type")
-        return JSONResponse(status_code=502, content={
-            "filename": filename,
-            "extension": ext,
+        return 502, {
             "skills": [],
             "error": "AI parser returned no usable result",
             "ai_raw": None
-        })
+        }
 
     # Ensure skills key exists and is a list
     skills = parsed.get("skills")
@@ -117,25 +282,93 @@ async def upload_resume(file: UploadFile = File(...)):
 
     if parsed.get("error"):
         logger.warning("AI parser reported an error: %s", parsed.get("error"))
-        return JSONResponse(status_code=502, content={
-            "filename": filename,
-            "extension": ext,
+        return 502, {
             "skills": skills,
             "error": f"AI parsing error: {parsed.get('error')}",
             "ai_raw": parsed.get("raw"),
             "client_used": parsed.get("client_used")
-        })
+        }
 
     # Successful response
     is_resume_val = parsed.get("is_resume", False)
     is_resume = True if is_resume_val else False
-    response_payload = {
+    result = {"skills": skills, "is_resume": is_resume}
+    await cache.put(cache_key, result)
+    await semantic_cache.add(embedding, result)
+    return 200, result
+
+
+# In-flight parses keyed by cache key; duplicates await the same task instead
+# of each calling the model before the cache has been filled.
+_inflight: Dict[str, "asyncio.Future"] = {}
+
+
+async def _coalesce(key: str, factory: Callable[[], Awaitable[Any]]) -> Any:
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(factory())
+        _inflight[key] = task
+        task.add_done_callback(lambda _: _inflight.pop(key, None))
+    # shield: one client disconnecting must not cancel the parse others are waiting on
+    return await asyncio.shield(task)
+
+
+UPLOAD_CHUNK_BYTES = 1 << 20
+
+
+async def _read_upload(file: UploadFile) -> bytes:
+    """Read the spooled upload in chunks; backstop for bodies sent without Content-Length."""
+    if file.size is not None and file.size > MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail="File too large")
+    buf = io.BytesIO()
+    size = 0
+    try:
+        while True:
+            chunk = await file.read(UPLOAD_CHUNK_BYTES)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > MAX_UPLOAD_BYTES:
+                raise HTTPException(status_code=413, detail="File too large")
+            buf.write(chunk)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("Failed to read uploaded file")
+        raise HTTPException(status_code=400, detail=f"Failed to read uploaded file: {e}")
+    return buf.getvalue()
+
+
+@app.post("/upload")
+async def upload_resume(file: UploadFile = File(...)):
+    """Accepts .pdf or .docx resume files and returns extracted skills + parse info."""
+    filename = file.filename or "unknown"
+    ext = filename.split('.')[-1].lower()
+    if ext not in ('pdf', 'docx'):
+        raise HTTPException(status_code=400, detail="Unsupported file type. Use .pdf or .docx")
+
+    contents = await _read_upload(file)
+
+    # Identical uploads skip extraction and the model call entirely
+    digest = hashlib.sha256(contents).hexdigest()
+    cache_key = cache.make_key(ai_parser.MODEL, ai_parser.PROMPT_VERSION, ext, digest)
+    cached = await cache.get(cache_key)
+    if cached is not None:
+        logger.info("Cache hit for %s", digest)
+        return ORJSONResponse(content={
+            "filename": filename,
+            "extension": ext,
+            "skills": cached["skills"],
+            "is_resume": bool(cached.get("is_resume", False))
+        })
+
+    # Concurrent uploads of the same document share one parse
+    status_code, fields = await _coalesce(cache_key, lambda: _parse_contents(contents, ext, cache_key))
+    return ORJSONResponse(status_code=status_code, content={
         "filename": filename,
         "extension": ext,
-        "skills": skills,
-        "is_resume": is_resume
-    }
-    return JSONResponse(content=response_payload)
+        **fields
+    })
 
 
 @app.get("/health")
@@ -0,0 +1,87 @@
+# cache.py
+import os
+import orjson
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Optional
+
+try:
+    import diskcache
+except ImportError:
+    diskcache = None
+
+logger = logging.getLogger("cache")
+
+# -------------------------------
+# Extraction Cache
+# Keyed by model + prompt version + extension + sha256 of the uploaded bytes,
+# so a prompt or model change naturally invalidates old entries and the same
+# bytes uploaded as .pdf and .docx are parsed separately. Disk access (SQLite)
+# runs in a worker thread to keep it off the event loop.
+# -------------------------------
+CACHE_DIR = os.getenv("CACHE_DIR", "./cache")
+MEMORY_CACHE_SIZE = int(os.getenv("MEMORY_CACHE_SIZE", "256"))
+
+_memory: "OrderedDict[str, bytes]" = OrderedDict()
+_disk = None
+
+if diskcache is not None:
+    try:
+        _disk = diskcache.Cache(CACHE_DIR)
+    except Exception as e:
+        logger.exception("Failed to open disk cache at %s: %s", CACHE_DIR, e)
+else:
+    logger.info("diskcache not installed; using in-memory cache only")
+
+
+def make_key(model: str, prompt_version: str, ext: str, digest: str) -> str:
+    return f"{model}:{prompt_version}:{ext}:{digest}"
+
+
+def _is_valid(parsed) -> bool:
+    return isinstance(parsed, dict) and isinstance(parsed.get("skills"), list)
+
+
+async def get(key: str) -> Optional[dict]:
+    raw = _memory.get(key)
+    if raw is not None:
+        _memory.move_to_end(key)
+    elif _disk is not None:
+        try:
+            raw = await asyncio.to_thread(_disk.get, key)
+        except Exception:
+            logger.exception("Disk cache read failed")
+            raw = None
+
+    if raw is None:
+        return None
+
+    try:
+        parsed = orjson.loads(raw)
+    except Exception:
+        return None
+    if not _is_valid(parsed):
+        return None
+
+    _remember(key, raw)
+    return parsed
+
+
+async def put(key: str, value: dict) -> None:
+    if not _is_valid(value):
+        return
+    raw = orjson.dumps(value)
+    _remember(key, raw)
+    if _disk is not None:
+        try:
+            await asyncio.to_thread(_disk.set, key, raw)
+        except Exception:
+            logger.exception("Disk cache write failed")
+
+
+def _remember(key: str, raw: bytes) -> None:
+    _memory[key] = raw
+    _memory.move_to_end(key)
+    while len(_memory) > MEMORY_CACHE_SIZE:
+        _memory.popitem(last=False)
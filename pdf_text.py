@@ -0,0 +1,35 @@
+# pdf_text.py
+# Kept free of app/ai_parser imports: process-pool workers import only this
+# module (and pypdf), not the Groq clients or caches.
+import io
+import logging
+
+try:
+    from pypdf import PdfReader
+except ImportError:
+    PdfReader = None
+
+logger = logging.getLogger("pdf_text")
+
+
+def iter_page_text(pages, max_chars: int):
+    """Yield non-empty page text in order, stopping once max_chars have been produced."""
+    total = 0
+    for page in pages:
+        try:
+            text = page.extract_text() or ""
+        except Exception:
+            text = ""
+        if not text:
+            continue
+        yield text
+        total += len(text)
+        if total >= max_chars:
+            logger.info("PDF text reached %d chars; skipping remaining pages", max_chars)
+            return
+
+
+def extract_pages(file_bytes: bytes, start: int, stop: int, max_chars: int) -> str:
+    """Process-pool worker: decode pages [start, stop) of the PDF."""
+    reader = PdfReader(io.BytesIO(file_bytes))
+    return "\n".join(iter_page_text(reader.pages[start:stop], max_chars))
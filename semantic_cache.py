@@ -0,0 +1,115 @@
+# semantic_cache.py
+import os
+import re
+import asyncio
+import logging
+import threading
+from typing import List, Optional, Tuple, Any
+
+# numpy/faiss/sentence-transformers (and torch) are imported by load() only when
+# the cache is enabled, so the default deployment never pays for them.
+np = faiss = None
+
+logger = logging.getLogger("semantic_cache")
+
+# -------------------------------
+# Semantic Cache
+# Near-duplicate resumes (whitespace tweaks, a changed line) hash differently
+# but extract to the same skills; reuse the result when the embeddings of the
+# normalized text are close enough. Opt-in: needs SEMANTIC_CACHE=1 plus
+# sentence-transformers and faiss-cpu installed; the model is loaded by load()
+# at startup and lookups are skipped until then.
+# -------------------------------
+EMBEDDING_MODEL = os.getenv("SEMANTIC_CACHE_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+SIMILARITY_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.97"))
+MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "10000"))
+CHUNK_CHARS = 1000
+
+_enabled = os.getenv("SEMANTIC_CACHE", "0") == "1"
+
+_lock = threading.Lock()
+_model = None
+_index = None
+_results: List[dict] = []
+
+
+def _normalize(text: str) -> str:
+    return re.sub(r"\s+", " ", text.lower()).strip()
+
+
+def load() -> None:
+    """Load the embedding model and build the index; called once from the app lifespan."""
+    if not _enabled or _model is not None:
+        return
+    try:
+        from sentence_transformers import SentenceTransformer
+    except ImportError:
+        logger.warning("SEMANTIC_CACHE=1 but sentence-transformers/faiss are not installed; disabled")
+        return
+    try:
+        _install(SentenceTransformer(EMBEDDING_MODEL))
+    except Exception:
+        logger.exception("Failed to load embedding model %s; semantic cache disabled", EMBEDDING_MODEL)
+
+
+def _install(model) -> None:
+    global np, faiss, _model, _index
+    import numpy
+    import faiss as faiss_module
+    np, faiss = numpy, faiss_module
+    _index = faiss.IndexFlatIP(model.get_sentence_embedding_dimension())
+    _results.clear()
+    _model = model
+
+
+def _embed(text: str):
+    # The model only sees ~256 tokens per input, so embed fixed-size chunks and
+    # average them; otherwise two resumes sharing a header would look identical.
+    norm = _normalize(text)
+    chunks = [norm[i:i + CHUNK_CHARS] for i in range(0, len(norm), CHUNK_CHARS)] or [""]
+    vecs = _model.encode(chunks, normalize_embeddings=True)
+    vec = np.asarray(vecs, dtype="float32").mean(axis=0, keepdims=True)
+    faiss.normalize_L2(vec)
+    return vec
+
+
+def _lookup_sync(text: str) -> Tuple[Optional[dict], Any]:
+    # Embedding is the slow part and needs no lock; only the index is shared
+    vec = _embed(text)
+    with _lock:
+        if _index.ntotal == 0:
+            return None, vec
+        scores, ids = _index.search(vec, 1)
+        score, idx = float(scores[0][0]), int(ids[0][0])
+        hit = _results[idx] if idx >= 0 and score >= SIMILARITY_THRESHOLD else None
+    if hit is not None:
+        logger.info("Semantic cache hit (score %.4f)", score)
+    return hit, vec
+
+
+def _add_sync(vec, result: dict) -> None:
+    with _lock:
+        if _index.ntotal >= MAX_ENTRIES:
+            return
+        _index.add(vec)
+        _results.append(result)
+
+
+async def lookup(text: str) -> Tuple[Optional[dict], Any]:
+    """Return (cached_result_or_None, embedding); pass the embedding back to add()."""
+    if _model is None:
+        return None, None
+    try:
+        return await asyncio.to_thread(_lookup_sync, text)
+    except Exception:
+        logger.exception("Semantic cache lookup failed")
+        return None, None
+
+
+async def add(vec, result: dict) -> None:
+    if _model is None or vec is None:
+        return
+    try:
+        await asyncio.to_thread(_add_sync, vec, result)
+    except Exception:
+        logger.exception("Semantic cache insert failed")
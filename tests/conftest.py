@@ -0,0 +1,8 @@
+import os
+import sys
+import tempfile
+
+# Keep the on-disk extraction cache out of the working tree during tests
+os.environ.setdefault("CACHE_DIR", tempfile.mkdtemp(prefix="resume-cache-"))
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,191 @@
+import asyncio
+import types
+
+import httpx
+import pytest
+from groq import APIConnectionError, AuthenticationError, BadRequestError, InternalServerError, RateLimitError
+
+import ai_parser
+
+REQUEST = httpx.Request("POST", "https://api.groq.com/openai/v1/chat/completions")
+
+
+def status_error(cls, status: int, body=None, headers=None):
+    response = httpx.Response(status, headers=headers or {}, request=REQUEST)
+    return cls(f"Error code: {status}", response=response, body=body)
+
+
+def completion(content: str):
+    message = types.SimpleNamespace(content=content)
+    return types.SimpleNamespace(choices=[types.SimpleNamespace(message=message)])
+
+
+class FakeClient:
+    """Stands in for AsyncGroq; pops one scripted outcome per call."""
+
+    def __init__(self, name, outcomes):
+        self.name = name
+        self.outcomes = list(outcomes)
+        self.calls = []
+        self.chat = types.SimpleNamespace(completions=types.SimpleNamespace(create=self._create))
+
+    async def _create(self, **kwargs):
+        self.calls.append(kwargs["messages"])
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return completion(outcome)
+
+
+@pytest.fixture
+def clients(monkeypatch):
+    """Install fake clients in place of the configured Groq clients."""
+    installed = []
+
+    def install(*fakes):
+        installed[:] = fakes
+        return fakes
+
+    monkeypatch.setattr(ai_parser, "_clients", installed)
+    monkeypatch.setattr(ai_parser, "_client_cooldown", {})
+    monkeypatch.setattr(ai_parser, "_client_counter", iter(range(10 ** 6)))
+    return install
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Record asyncio.sleep calls and advance a fake monotonic clock instead of waiting."""
+    recorded = []
+    clock = [1000.0]
+
+    async def fake_sleep(seconds):
+        recorded.append(seconds)
+        clock[0] += seconds
+
+    monkeypatch.setattr(ai_parser.asyncio, "sleep", fake_sleep)
+    monkeypatch.setattr(ai_parser.time, "monotonic", lambda: clock[0])
+    return recorded
+
+
+def rate_limited(retry_after=None):
+    headers = {"retry-after": str(retry_after)} if retry_after is not None else {}
+    return status_error(RateLimitError, 429, headers=headers)
+
+
+MESSAGES = [{"role": "user", "content": "resume"}]
+
+
+def test_json_validate_failed_goes_through_feedback_loop(clients, sleeps):
+    failed = status_error(BadRequestError, 400, body={"error": {
+        "code": "json_validate_failed",
+        "failed_generation": "skills: [python]",
+    }})
+    # A single key: if the 400 counted as a key failure there would be nothing left to retry on
+    (a,) = clients(FakeClient("a", [failed, '{"skills": ["Python"], "is_resume": true}']))
+    out = asyncio.run(ai_parser.extract_resume_info_async("resume"))
+
+    assert out == {"skills": ["python"], "is_resume": True, "error": None}
+    assert len(a.calls) == 2
+    retry = a.calls[1]
+    assert retry[-2] == {"role": "assistant", "content": "skills: [python]"}
+    assert "json_validate_failed" in retry[-1]["content"]
+
+
+def test_other_bad_requests_exhaust_the_key(clients, sleeps):
+    bad = status_error(BadRequestError, 400, body={"error": {"code": "model_not_found"}})
+    (a,) = clients(FakeClient("a", [bad]))
+    out = asyncio.run(ai_parser.parse_document("resume"))
+
+    assert out["error"] == "No model response."
+    assert len(a.calls) == 1
+
+
+def test_keys_are_used_round_robin(clients, sleeps):
+    a, b = clients(FakeClient("a", ["{}", "{}"]), FakeClient("b", ["{}"]))
+    used = [asyncio.run(ai_parser._call_groq(MESSAGES))[1] for _ in range(3)]
+
+    assert used == ["client1", "client2", "client1"]
+    assert sleeps == []
+
+
+def test_rate_limited_key_moves_to_next_without_waiting(clients, sleeps):
+    a, b = clients(FakeClient("a", [rate_limited(5)]), FakeClient("b", ["{}"]))
+    raw, used, _ = asyncio.run(ai_parser._call_groq(MESSAGES))
+
+    assert (raw, used) == ("{}", "client2")
+    assert sleeps == []
+    assert ai_parser._client_cooldown[0] == pytest.approx(1005.0)
+
+
+def test_cooling_key_is_skipped_by_later_calls(clients, sleeps):
+    a, b = clients(FakeClient("a", [rate_limited(30)]), FakeClient("b", ["{}", "{}"]))
+    asyncio.run(ai_parser._call_groq(MESSAGES))
+    raw, used, _ = asyncio.run(ai_parser._call_groq(MESSAGES))
+
+    assert used == "client2"
+    assert len(a.calls) == 1
+
+
+def test_waits_only_when_every_key_is_cooling(clients, sleeps):
+    a, b = clients(
+        FakeClient("a", [rate_limited(3), "{}"]),
+        FakeClient("b", [rate_limited(7)]),
+    )
+    raw, used, _ = asyncio.run(ai_parser._call_groq(MESSAGES))
+
+    # Both keys rate limited; sleep until the earliest cooldown expires, then retry that key
+    assert sleeps == [pytest.approx(3.0)]
+    assert used == "client1"
+
+
+def test_keys_exhausted_after_max_attempts(clients, sleeps):
+    a, b = clients(
+        FakeClient("a", [status_error(InternalServerError, 500)] * 2),
+        FakeClient("b", [APIConnectionError(request=REQUEST)] * 2),
+    )
+    assert asyncio.run(ai_parser._call_groq(MESSAGES, max_attempts=2)) == (None, None, None)
+    assert len(a.calls) == 2
+    assert len(b.calls) == 2
+
+
+def test_non_retryable_error_exhausts_key_immediately(clients, sleeps):
+    a, b = clients(
+        FakeClient("a", [status_error(AuthenticationError, 401)]),
+        FakeClient("b", ["{}"]),
+    )
+    raw, used, _ = asyncio.run(ai_parser._call_groq(MESSAGES))
+
+    assert used == "client2"
+    assert len(a.calls) == 1
+    assert 0 not in ai_parser._client_cooldown
+
+
+@pytest.mark.parametrize("error, attempt, expected", [
+    (rate_limited(12), 1, 12.0),
+    (rate_limited(), 2, 4.0),
+    (rate_limited(3600), 1, ai_parser.MAX_RETRY_AFTER),
+    (APIConnectionError(request=REQUEST), 2, 1.0),
+    (status_error(InternalServerError, 503), 3, 8.0),
+    (status_error(AuthenticationError, 401), 1, None),
+])
+def test_backoff_seconds(error, attempt, expected):
+    assert ai_parser._backoff_seconds(error, attempt) == expected
+
+
+@pytest.mark.parametrize("text, limit, expected", [
+    ("short", 10, "short"),
+    ("exactly10!", 10, "exactly10!"),
+    ("line one\nline two\nline three", 20, "line one\nline two"),
+    ("no newlines at all here", 10, "no newline"),
+    ("\nleading newline only", 10, "\nleading n"),
+])
+def test_truncate(text, limit, expected):
+    assert ai_parser._truncate(text, limit) == expected
+
+
+def test_parse_document_sends_truncated_text(clients, sleeps, monkeypatch):
+    monkeypatch.setattr(ai_parser, "MAX_CHARS", 12)
+    (a,) = clients(FakeClient("a", ['{"skills": []}']))
+    asyncio.run(ai_parser.parse_document("python\njava\nrust\ngo"))
+
+    assert a.calls[0][-1]["content"] == ai_parser.DOCUMENT_PREFIX + "python\njava" + "\n"
@@ -0,0 +1,48 @@
+import asyncio
+
+import httpx
+
+import app
+import cache
+
+
+async def _post_concurrently(body: bytes, filename: str, n: int):
+    transport = httpx.ASGITransport(app=app.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        return await asyncio.gather(*(
+            client.post("/upload", files={"file": (filename, body, "application/octet-stream")})
+            for _ in range(n)
+        ))
+
+
+def test_concurrent_identical_uploads_parse_once(monkeypatch):
+    calls = []
+
+    async def text_from_pdf(file_bytes):
+        return "python resume"
+
+    async def slow_parser(text):
+        calls.append(text)
+        await asyncio.sleep(0.05)  # keep the first parse in flight while the rest arrive
+        return {"skills": ["python"], "is_resume": True, "error": None}
+
+    monkeypatch.setattr(app, "extract_text_from_pdf", text_from_pdf)
+    monkeypatch.setattr(app.ai_parser, "extract_resume_info_async", slow_parser)
+    monkeypatch.setattr(cache, "_disk", None)
+
+    responses = asyncio.run(_post_concurrently(b"%PDF coalesce-success", "resume.pdf", 5))
+
+    assert [r.status_code for r in responses] == [200] * 5
+    assert all(r.json()["skills"] == ["python"] for r in responses)
+    assert len(calls) == 1
+    assert app._inflight == {}
+
+
+def test_inflight_cleared_when_parse_raises(monkeypatch):
+    monkeypatch.setattr(cache, "_disk", None)
+
+    # Not a zip, so extract_text_from_docx fails and _parse_contents raises a 500 HTTPException
+    responses = asyncio.run(_post_concurrently(b"not a docx", "resume.docx", 3))
+
+    assert [r.status_code for r in responses] == [500] * 3
+    assert app._inflight == {}
@@ -0,0 +1,94 @@
+import io
+import zipfile
+
+import pytest
+
+import app
+
+CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/word/document.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+    '</Types>'
+)
+RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="word/document.xml"/>'
+    '</Relationships>'
+)
+NS = (
+    'xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main" '
+    'xmlns:mc="http://schemas.openxmlformats.org/markup-compatibility/2006" '
+    'xmlns:wps="http://schemas.microsoft.com/office/word/2010/wordprocessingShape" '
+    'xmlns:v="urn:schemas-microsoft-com:vml" '
+    'mc:Ignorable="wps"'
+)
+TEXT_BOX = '<w:txbxContent><w:p><w:r><w:t>Docker</w:t></w:r></w:p></w:txbxContent>'
+BODY = (
+    # Tab and line break between skills
+    '<w:p><w:r><w:t>Skills:</w:t><w:tab/><w:t>Python</w:t><w:br/><w:t>Java</w:t></w:r></w:p>'
+    # Word split across runs, plus a hyperlink run
+    '<w:p><w:r><w:t>Kuber</w:t></w:r><w:r><w:t>netes</w:t></w:r>'
+    '<w:hyperlink><w:r><w:t xml:space="preserve"> AWS</w:t></w:r></w:hyperlink></w:p>'
+    # Text box with both the DrawingML choice and the VML fallback copy
+    '<w:p><w:r><w:t>Tools</w:t></w:r><w:r><mc:AlternateContent>'
+    f'<mc:Choice Requires="wps"><w:drawing><wps:txbx>{TEXT_BOX}</wps:txbx></w:drawing></mc:Choice>'
+    f'<mc:Fallback><w:pict><v:textbox>{TEXT_BOX}</v:textbox></w:pict></mc:Fallback>'
+    '</mc:AlternateContent></w:r></w:p>'
+    # Table cell
+    '<w:tbl><w:tr><w:tc><w:p><w:r><w:t>SQL</w:t></w:r></w:p></w:tc></w:tr></w:tbl>'
+)
+
+
+def make_docx(body: str = BODY) -> bytes:
+    document = f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?><w:document {NS}><w:body>{body}</w:body></w:document>'
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as z:
+        z.writestr("[Content_Types].xml", CONTENT_TYPES)
+        z.writestr("_rels/.rels", RELS)
+        z.writestr("word/document.xml", document)
+    return buf.getvalue()
+
+
+def test_docx_keeps_tabs_and_breaks():
+    text = app.extract_text_from_docx(make_docx())
+    assert text.splitlines()[:2] == ["Skills:\tPython", "Java"]
+
+
+def test_docx_joins_runs_and_hyperlinks():
+    text = app.extract_text_from_docx(make_docx())
+    assert "Kubernetes AWS" in text.splitlines()
+
+
+def test_docx_text_box_emitted_once():
+    text = app.extract_text_from_docx(make_docx())
+    lines = text.splitlines()
+    assert lines.count("Docker") == 1
+    assert "Tools" in lines
+    assert lines[-1] == "SQL"
+
+
+def test_docx_does_not_expand_entities():
+    doctype = '<!DOCTYPE w:document [<!ENTITY secret SYSTEM "file:///etc/hostname">]>'
+    body = '<w:p><w:r><w:t>Go &secret;</w:t></w:r></w:p>'
+    document = (
+        f'<?xml version="1.0" encoding="UTF-8"?>{doctype}'
+        f'<w:document {NS}><w:body>{body}</w:body></w:document>'
+    )
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as z:
+        z.writestr("word/document.xml", document)
+    text = app.extract_text_from_docx(buf.getvalue())
+    assert text.strip() == "Go"
+
+
+def test_docx_rejects_oversized_document_xml(monkeypatch):
+    monkeypatch.setattr(app, "MAX_DOCX_XML_BYTES", 100)
+    with pytest.raises(RuntimeError, match="limit 100"):
+        app.extract_text_from_docx(make_docx())
@@ -0,0 +1,114 @@
+import asyncio
+import os
+import signal
+import threading
+
+import pytest
+
+import app
+
+
+def make_pdf(page_texts) -> bytes:
+    """Build a minimal PDF with one line of Helvetica text per page."""
+    n = len(page_texts)
+    font_id = 3 + 2 * n
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [" + b" ".join(b"%d 0 R" % (3 + 2 * i) for i in range(n)) + b"] /Count %d >>" % n,
+    ]
+    for i, text in enumerate(page_texts):
+        stream = b"BT /F1 12 Tf 72 720 Td (" + text.encode() + b") Tj ET"
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            b"/Resources << /Font << /F1 %d 0 R >> >> /Contents %d 0 R >>" % (font_id, 4 + 2 * i)
+        )
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+    objects.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for num, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % num + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % off for off in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+@pytest.fixture
+def pdf_pool(monkeypatch):
+    monkeypatch.setattr(app, "PDF_WORKERS", 2)
+    pool = app._start_pdf_pool()
+    monkeypatch.setattr(app, "_pdf_pool", pool)
+    yield pool
+    pool.shutdown()
+
+
+def test_short_pdf_decoded_in_process():
+    text = asyncio.run(app.extract_text_from_pdf(make_pdf(["Python", "Java"])))
+    assert text.splitlines() == ["Python", "Java"]
+
+
+def test_long_pdf_decoded_in_order_by_pool(pdf_pool):
+    pages = [f"Page {i}" for i in range(12)]
+    text = asyncio.run(app.extract_text_from_pdf(make_pdf(pages)))
+    assert text.splitlines() == pages
+
+
+def test_long_pdf_stops_at_model_limit(pdf_pool, monkeypatch):
+    monkeypatch.setattr(app.ai_parser, "MAX_CHARS", 20)
+    pages = [f"Page {i:02d}" for i in range(12)]
+    text = asyncio.run(app.extract_text_from_pdf(make_pdf(pages)))
+    # Three 7-char pages cross the 20-char limit; the second range is dropped
+    assert text.splitlines() == pages[:3]
+
+
+def test_long_pdf_submits_one_range_per_worker(pdf_pool, monkeypatch):
+    submitted = []
+    real_submit = pdf_pool.submit
+
+    def recording_submit(fn, *args):
+        submitted.append(args[1:3])
+        return real_submit(fn, *args)
+
+    monkeypatch.setattr(pdf_pool, "submit", recording_submit)
+    asyncio.run(app.extract_text_from_pdf(make_pdf([f"Page {i}" for i in range(12)])))
+    assert submitted == [(0, 6), (6, 12)]
+
+
+def test_broken_pool_is_replaced_and_document_still_decoded(pdf_pool, monkeypatch):
+    # Start the workers, then kill them the way the OOM killer would
+    asyncio.run(app.extract_text_from_pdf(make_pdf([f"Warm {i}" for i in range(12)])))
+    for proc in list(pdf_pool._processes.values()):
+        os.kill(proc.pid, signal.SIGKILL)
+        proc.join()
+
+    pages = [f"Page {i}" for i in range(12)]
+    assert asyncio.run(app.extract_text_from_pdf(make_pdf(pages))).splitlines() == pages
+    assert app._pdf_pool is not pdf_pool
+
+    # The replacement pool serves the next long PDF
+    replacement = app._pdf_pool
+    assert asyncio.run(app.extract_text_from_pdf(make_pdf(pages))).splitlines() == pages
+    assert app._pdf_pool is replacement
+    replacement.shutdown()
+
+
+def test_in_process_decode_runs_off_the_event_loop(monkeypatch):
+    loop_thread = []
+    decode_thread = []
+    real_read = app._read_pdf
+
+    def recording_read(*args):
+        decode_thread.append(threading.get_ident())
+        return real_read(*args)
+
+    async def run():
+        loop_thread.append(threading.get_ident())
+        return await app.extract_text_from_pdf(make_pdf(["Python"]))
+
+    monkeypatch.setattr(app, "_read_pdf", recording_read)
+    assert asyncio.run(run()) == "Python"
+    assert decode_thread and decode_thread != loop_thread
@@ -0,0 +1,68 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("faiss")
+
+import numpy as np
+
+import semantic_cache
+
+
+class StubModel:
+    """Maps text to a fixed vector: 'a' texts point one way, 'b' texts another."""
+
+    VECTORS = {
+        "a": [1.0, 0.0, 0.0],
+        "a2": [0.99, 0.1, 0.0],   # cosine ~0.995 to "a"
+        "b": [0.0, 1.0, 0.0],
+        "c": [0.0, 0.0, 1.0],
+    }
+
+    def get_sentence_embedding_dimension(self):
+        return 3
+
+    def encode(self, chunks, normalize_embeddings=True):
+        vecs = np.asarray([self.VECTORS[c.split()[0]] for c in chunks], dtype="float32")
+        return vecs / np.linalg.norm(vecs, axis=1, keepdims=True)
+
+
+@pytest.fixture
+def stub_cache(monkeypatch):
+    monkeypatch.setattr(semantic_cache, "_model", None)
+    monkeypatch.setattr(semantic_cache, "_index", None)
+    monkeypatch.setattr(semantic_cache, "_results", [])
+    semantic_cache._install(StubModel())
+
+
+def remember(text, result):
+    _, vec = asyncio.run(semantic_cache.lookup(text))
+    asyncio.run(semantic_cache.add(vec, result))
+
+
+def test_hit_above_threshold(stub_cache):
+    remember("a resume", {"skills": ["python"], "is_resume": True})
+    hit, _ = asyncio.run(semantic_cache.lookup("a2 resume"))
+    assert hit == {"skills": ["python"], "is_resume": True}
+
+
+def test_miss_below_threshold(stub_cache):
+    remember("a resume", {"skills": ["python"], "is_resume": True})
+    hit, vec = asyncio.run(semantic_cache.lookup("b resume"))
+    assert hit is None
+    assert vec is not None
+
+
+def test_max_entries_cap(stub_cache, monkeypatch):
+    monkeypatch.setattr(semantic_cache, "MAX_ENTRIES", 1)
+    remember("a resume", {"skills": ["python"]})
+    remember("c resume", {"skills": ["go"]})
+
+    assert semantic_cache._index.ntotal == 1
+    assert asyncio.run(semantic_cache.lookup("c resume"))[0] is None
+
+
+def test_disabled_without_model(monkeypatch):
+    monkeypatch.setattr(semantic_cache, "_model", None)
+    assert asyncio.run(semantic_cache.lookup("a resume")) == (None, None)
@@ -0,0 +1,45 @@
+from fastapi.testclient import TestClient
+
+import app
+import cache
+
+
+async def _async(value):
+    return value
+
+
+def test_rejects_large_content_length_before_parsing(monkeypatch):
+    monkeypatch.setattr(app, "MAX_UPLOAD_BYTES", 1024)
+    monkeypatch.setattr(app, "MULTIPART_OVERHEAD_BYTES", 0)
+
+    async def fail_read(file):
+        raise AssertionError("upload body should not have been read")
+
+    monkeypatch.setattr(app, "_read_upload", fail_read)
+    client = TestClient(app.app)
+    resp = client.post(
+        "/upload",
+        files={"file": ("resume.pdf", b"x" * 4096, "application/pdf")},
+        headers={"Origin": "http://example.com"},
+    )
+    assert resp.status_code == 413
+    assert resp.json() == {"detail": "File too large"}
+    assert resp.headers["access-control-allow-origin"] == "*"
+
+
+def test_cache_key_includes_extension(monkeypatch):
+    async def parsed(text):
+        return {"skills": ["python"], "is_resume": True, "error": None}
+
+    monkeypatch.setattr(app.ai_parser, "extract_resume_info_async", parsed)
+    monkeypatch.setattr(app, "extract_text_from_pdf", lambda b: _async("python"))
+    monkeypatch.setattr(cache, "_disk", None)
+    client = TestClient(app.app)
+    body = b"%PDF-1.4 not really"
+
+    first = client.post("/upload", files={"file": ("resume.pdf", body, "application/pdf")})
+    assert first.status_code == 200 and first.json()["skills"] == ["python"]
+
+    # Same bytes as .docx must be parsed as a docx (and fail), not served from the pdf entry
+    second = client.post("/upload", files={"file": ("resume.docx", body, "application/octet-stream")})
+    assert second.status_code == 500